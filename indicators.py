@@ -0,0 +1,50 @@
+import numpy as np
+from numba import njit
+from window_ops.ewm import ewm_mean
+from window_ops.rolling import rolling_mean
+
+# Kept out of stock.py: Streamlit re-executes the script on every rerun,
+# which would create a fresh numba dispatcher each time. A module is
+# imported, and its kernels compiled, once per server process.
+
+# RSI kernel: Wilder's smoothing (SMA seed over the first `period` changes,
+# then recursive average) in a single pass over close
+@njit(cache=True, fastmath=True)
+def rsi_wilder(close, period=14):
+    out = np.empty_like(close)
+    out[:period + 1] = np.nan
+    if close.shape[0] <= period:
+        return out
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = close[i] - close[i - 1]
+        avg_gain += max(d, 0.0)
+        avg_loss += max(-d, 0.0)
+    avg_gain /= period
+    avg_loss /= period
+    out[period] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss) if avg_loss else 100.0
+    keep = (period - 1) / period
+    step = 1.0 / period
+    for i in range(period + 1, close.shape[0]):
+        # Each change feeds exactly one side; the other just decays
+        d = close[i] - close[i - 1]
+        avg_gain *= keep
+        avg_loss *= keep
+        if d > 0.0:
+            avg_gain += d * step
+        else:
+            avg_loss -= d * step
+        out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss) if avg_loss else 100.0
+    return out
+
+# Compile the kernels at first import. That import happens during the
+# first script run, so the first visitor pays the JIT cost once and later
+# reruns and sessions reuse the compiled code.
+def _warm_up():
+    dummy = np.linspace(1.0, 2.0, 100)
+    rolling_mean(dummy, window_size=50)
+    ewm_mean(dummy, alpha=2 / 21)
+    rsi_wilder(dummy, 14)
+
+_warm_up()
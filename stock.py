@@ -1,13 +1,59 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 import yfinance as yf
+from curl_cffi import requests as curl_requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+import os
+import tempfile
+import time
 import pytz
+from tsdownsample import MinMaxLTTBDownsampler
+from indicators import ewm_mean, rolling_mean, rsi_wilder
 
 # Set page configuration
 st.set_page_config(page_title="Stock Dashboard", layout="wide")
 
+# Max points per trace sent to the browser
+MAX_PLOT_POINTS = 2000
+
+# Metrics offered in the chart selector, in display order
+FEATURE_CANDIDATES = pd.Index(['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'SMA_50', 'EMA_20', 'RSI'])
+
+# Range selector buttons shown above the chart
+RANGE_SELECTOR = dict(
+    buttons=[
+        dict(count=1, label="1M", step="month", stepmode="backward"),
+        dict(count=6, label="6M", step="month", stepmode="backward"),
+        dict(count=1, label="YTD", step="year", stepmode="todate"),
+        dict(count=1, label="1Y", step="year", stepmode="backward"),
+        dict(step="all")
+    ]
+)
+
+# Number formats for the raw data table
+RAW_COLUMN_CONFIG = {
+    'Open': st.column_config.NumberColumn(format='%.4f'),
+    'High': st.column_config.NumberColumn(format='%.4f'),
+    'Low': st.column_config.NumberColumn(format='%.4f'),
+    'Close': st.column_config.NumberColumn(format='%.4f'),
+    'Adj Close': st.column_config.NumberColumn(format='%.4f'),
+    'Volume': st.column_config.NumberColumn(format='localized'),
+    'SMA_50': st.column_config.NumberColumn(format='%.4f'),
+    'EMA_20': st.column_config.NumberColumn(format='%.4f'),
+    'RSI': st.column_config.NumberColumn(format='%.2f')
+}
+
+# On-disk price cache, shared across sessions and server restarts. Files
+# expire after a day since dividends and splits rewrite adjusted history.
+CACHE_DIR = Path(__file__).parent / ".cache" / "prices"
+CACHE_MAX_AGE = 24 * 3600
+# Temp files older than this were left behind by an interrupted write
+CACHE_TMP_MAX_AGE = 600
+
 # Tips
 st.markdown("""
 **Tips:**
@@ -23,8 +69,12 @@ st.title("📈 Interactive Stock Market Dashboard")
 
 # Sidebar
 st.sidebar.title("⚙️ Controls")
-raw_ticker = st.sidebar.text_input("Enter Stock Ticker (e.g., AAPL)", "AAPL")
-ticker = raw_ticker.strip().split()[0]
+raw_ticker = st.sidebar.text_input("Enter Stock Ticker(s) (e.g., AAPL MSFT)", "AAPL")
+tickers = list(dict.fromkeys(raw_ticker.strip().split()))
+if len(tickers) > 1:
+    ticker = st.sidebar.selectbox("Ticker to Analyze", tickers)
+else:
+    ticker = tickers[0] if tickers else ""
 start_date = st.sidebar.date_input("Start Date", datetime(2020, 1, 1))
 end_date = st.sidebar.date_input("End Date", datetime.now(pytz.timezone('US/Eastern')).date())
 
@@ -34,56 +84,167 @@ show_sma = st.sidebar.checkbox("Simple Moving Average (50 days)")
 show_ema = st.sidebar.checkbox("Exponential Moving Average (20 days)")
 show_rsi = st.sidebar.checkbox("Relative Strength Index (RSI)")
 
+# Shared HTTP session so reruns reuse Yahoo connections and cookies.
+# curl_cffi keeps one curl handle (and its connections) per thread, so
+# downloads run on the long-lived threads of get_executor().
+@st.cache_resource
+def get_session():
+    return curl_requests.Session(impersonate="chrome")
+
+# Download workers, kept for the life of the server process
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=16)
+
+# Download from Yahoo and persist closed ranges to the on-disk cache
+def download_data(ticker, start_str, end_str, path):
+    # Ticker.history keeps its state per instance; yf.download shares
+    # module-level buffers and can mix up tickers fetched concurrently
+    data = yf.Ticker(ticker, session=get_session()).history(
+        start=start_str, end=end_str, auto_adjust=True, actions=False)
+    if data.empty:
+        return pd.DataFrame()
+
+    # Plain dates, as yf.download returned for daily bars
+    data.index = data.index.tz_localize(None)
+
+    # Smallest integer type that fits volume; prices stay float64 for the
+    # 4-decimal display and indicator math
+    if 'Volume' in data.columns:
+        data['Volume'] = pd.to_numeric(data['Volume'], downcast='integer')
+
+    # Only persist ranges that have closed; today's bar can still change
+    today_str = str(datetime.now(pytz.timezone('US/Eastern')).date())
+    if end_str < today_str:
+        write_cache(data, path)
+    return data
+
+# Remove expired price files and leftover temp files, so ranges that are
+# never requested again don't accumulate on disk
+def sweep_cache():
+    now = time.time()
+    for pattern, max_age in (("*.parquet", CACHE_MAX_AGE), ("*.tmp", CACHE_TMP_MAX_AGE)):
+        for p in CACHE_DIR.glob(pattern):
+            try:
+                if now - p.stat().st_mtime > max_age:
+                    p.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+# Write via a temp file and rename so readers never see a partial file
+def write_cache(data, path):
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        sweep_cache()
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+        data.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        os.replace(tmp_path, path)
+    except Exception:
+        # A failed cache write must not fail the load
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# Cached frame for `path` if present, fresh and readable; otherwise None
+def read_cache(path):
+    try:
+        if time.time() - path.stat().st_mtime <= CACHE_MAX_AGE:
+            return pd.read_parquet(path, engine='pyarrow')
+    except FileNotFoundError:
+        return None
+    except Exception:
+        pass
+    # Stale or unreadable: remove it so the next download replaces it
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
+    return None
+
 # Data loader
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_data(ticker, start_str, end_str):
-    try:
-        data = yf.download(ticker, start=start_str, end=end_str)
-        return data if not data.empty else pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        return pd.DataFrame()
+    safe_ticker = "".join(c if c.isalnum() or c in ".-^=" else "_" for c in ticker)
+    path = CACHE_DIR / f"{safe_ticker}_{start_str}_{end_str}.parquet"
+    data = read_cache(path)
+    if data is None:
+        data = download_data(ticker, start_str, end_str, path)
+    return data
+
+# Fetch every ticker concurrently; the downloads are network-bound
+def load_watchlist(tickers, start_str, end_str):
+    if not tickers:
+        return {}
+    ex = get_executor()
+    futures = {t: ex.submit(load_data, t, start_str, end_str) for t in tickers}
+    frames = {}
+    for t, future in futures.items():
+        try:
+            frames[t] = future.result()
+        except Exception as e:
+            st.error(f"Error loading data for {t}: {str(e)}")
+            frames[t] = pd.DataFrame()
+    return frames
 
-df = load_data(ticker, str(start_date), str(end_date))
+# Row positions kept when downsampling one series for plotting. Not cached:
+# hashing the input costs about as much as MinMax-LTTB itself.
+def downsample_index(values, n_out=MAX_PLOT_POINTS):
+    if values.shape[0] <= n_out:
+        return np.arange(values.shape[0])
+    values = np.ascontiguousarray(values)
+    return MinMaxLTTBDownsampler().downsample(values, n_out=n_out, parallel=True)
 
-# Flatten multi-index
-if not df.empty and isinstance(df.columns, pd.MultiIndex):
-    df.columns = df.columns.get_level_values(0)
+# Price history chart for the selected metrics
+def render_chart(df, selected_features, ticker):
+    # Downsample (MinMax-LTTB) each trace on its own values so every series keeps its extrema
+    dates = df.index.to_numpy()
+    fig = go.Figure()
+    for feature in selected_features:
+        y = df[feature].to_numpy()
+        idx = downsample_index(y)
+        fig.add_trace(go.Scatter(x=dates[idx], y=y[idx], name=feature, mode='lines'))
+    fig.update_layout(title=f"{ticker} Stock Price History",
+                      xaxis_title='Date',
+                      yaxis_title='Price (USD)',
+                      legend_title_text='Metric',
+                      showlegend=True,
+                      template='plotly_dark')
+    fig.update_xaxes(rangeslider_visible=True, rangeselector=RANGE_SELECTOR)
+    st.plotly_chart(fig, use_container_width=True)
+
+with st.spinner("Loading data..."):
+    frames = load_watchlist(tickers, str(start_date), str(end_date))
+df = frames.get(ticker, pd.DataFrame())
+
+# Drop rows Yahoo returned without a Close; one NaN would carry through
+# the RSI recursion and into the downsampler
+if not df.empty:
+    df = df[~np.isnan(df['Close'].to_numpy())]
 
 # Add indicators
 if not df.empty:
+    close = df['Close'].to_numpy()
     if show_sma:
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
+        df['SMA_50'] = rolling_mean(close, window_size=50)
     if show_ema:
-        df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
+        df['EMA_20'] = ewm_mean(close, alpha=2 / 21)
     if show_rsi:
-        delta = df['Close'].diff()
-        gain = delta.clip(lower=0)
-        loss = -delta.clip(upper=0)
-        avg_gain = gain.ewm(com=13, min_periods=14).mean()
-        avg_loss = loss.ewm(com=13, min_periods=14).mean()
-        rs = avg_gain / avg_loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        df['RSI'] = rsi_wilder(close, 14)
 
-    df.dropna(inplace=True)  # drop NaNs from indicators
+    # Drop the indicator warm-up rows (SMA: first 49, RSI: first 14)
+    warmup = max(49 if show_sma else 0, 14 if show_rsi else 0)
+    df = df.iloc[warmup:]
 
 # Main area
 if not df.empty:
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("First Date", df.index.min().strftime('%Y-%m-%d'))
-    with col2:
-        st.metric("Last Date", df.index.max().strftime('%Y-%m-%d'))
-    with col3:
-        latest_close = df['Close'].iloc[-1]
-        previous_close = df['Close'].iloc[-2] if len(df) > 1 else latest_close
-        change = ((latest_close - previous_close) / previous_close) * 100 if previous_close != 0 else 0.0
-        st.metric("Latest Close Price", f"${latest_close:.4f}", f"{change:.2f}%")
+    # Summary metrics are filled in only once a metric is selected
+    summary = st.container()
 
     st.subheader(f"{ticker} Stock Analysis")
 
     # Auto-select default features
-    available_features = [col for col in ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'SMA_50', 'EMA_20', 'RSI'] if col in df.columns]
+    available_features = FEATURE_CANDIDATES.intersection(df.columns, sort=False).tolist()
     default_features = ['Close']
     if show_sma: default_features.append('SMA_50')
     if show_ema: default_features.append('EMA_20')
@@ -95,52 +256,47 @@ if not df.empty:
         default=default_features
     )
 
-    if selected_features:
-        fig = px.line(df, x=df.index, y=selected_features,
-                      title=f"{ticker} Stock Price History",
-                      labels={'value': 'Price (USD)', 'variable': 'Metric'},
-                      template='plotly_dark')
-        fig.update_xaxes(
-            rangeslider_visible=True,
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1M", step="month", stepmode="backward"),
-                    dict(count=6, label="6M", step="month", stepmode="backward"),
-                    dict(count=1, label="YTD", step="year", stepmode="todate"),
-                    dict(count=1, label="1Y", step="year", stepmode="backward"),
-                    dict(step="all")
-                ])
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    else:
+    # Nothing to show: stop before any chart or statistics work
+    if not selected_features:
         st.warning("Please select at least one metric to visualize.")
+        st.stop()
+
+    with summary:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("First Date", df.index.min().strftime('%Y-%m-%d'))
+        with col2:
+            st.metric("Last Date", df.index.max().strftime('%Y-%m-%d'))
+        with col3:
+            latest_close = df['Close'].iloc[-1]
+            previous_close = df['Close'].iloc[-2] if len(df) > 1 else latest_close
+            change = ((latest_close - previous_close) / previous_close) * 100 if previous_close != 0 else 0.0
+            st.metric("Latest Close Price", f"${latest_close:.4f}", f"{change:.2f}%")
+
+    render_chart(df, selected_features, ticker)
 
     if st.checkbox("Show Raw Data"):
         st.subheader("Raw Data")
-        st.dataframe(df.sort_index(ascending=False).style.format({
-            'Open': '{:.4f}',
-            'High': '{:.4f}',
-            'Low': '{:.4f}',
-            'Close': '{:.4f}',
-            'Adj Close': '{:.4f}',
-            'Volume': '{:,}',
-            'SMA_50': '{:.4f}' if 'SMA_50' in df.columns else None,
-            'EMA_20': '{:.4f}' if 'EMA_20' in df.columns else None,
-            'RSI': '{:.2f}' if 'RSI' in df.columns else None
-        }))
+        # Formatting happens in the browser; iloc[::-1] is a reversed view of the date index
+        present = set(df.columns)
+        st.dataframe(df.iloc[::-1], column_config={
+            k: v for k, v in RAW_COLUMN_CONFIG.items() if k in present
+        })
 
     # Statistics
     st.subheader("Key Statistics")
+    high = df['High'].to_numpy()
+    low = df['Low'].to_numpy()
+    volume = df['Volume'].to_numpy()
     cols = st.columns(4)
     with cols[0]:
-        st.metric("52 Week High", f"${df['High'].max():.4f}")
+        st.metric("52 Week High", f"${np.nanmax(high):.4f}")
     with cols[1]:
-        st.metric("52 Week Low", f"${df['Low'].min():.4f}")
+        st.metric("52 Week Low", f"${np.nanmin(low):.4f}")
     with cols[2]:
-        st.metric("Average Volume", f"{df['Volume'].mean():,.0f}")
+        st.metric("Average Volume", f"{np.nanmean(volume):,.0f}")
     with cols[3]:
-        st.metric("Current Volume", f"{df['Volume'].iloc[-1]:,.0f}")
+        st.metric("Current Volume", f"{volume[-1]:,.0f}")
 
 else:
     st.warning("Please enter a valid stock ticker and date range.")